@@ -8,6 +8,22 @@
     SKLAND_NICKNAME - 用户昵称（可选），与Token顺序对应，用 & 分隔
     QMSG_KEY       - Qmsg酱推送Key（可选）
     LOG_LEVEL      - 日志等级: debug / info（默认 info）
+    SKLAND_REPORT_DETAIL - 报告是否包含每个账号的明细: 1 / 0（默认 1）
+    SKLAND_PREWARM - 计算设备指纹的同时预先建立连接: 1 / 0（默认 1）
+    SKLAND_STAGE_WORKERS - 各阶段并发数，如 auth=2,cred=2,binding=2,sign=4（默认均为 1）
+    SKLAND_QUEUE_SIZE    - 各阶段队列长度上限（默认 8）
+    SKLAND_CRYPTO_WORKERS - 设备指纹计算线程池大小，0 表示在事件循环中直接计算（默认 0）
+    SKLAND_STALL_THRESHOLD_MS - 事件循环阻塞告警阈值毫秒，0 关闭检测（默认 200）
+    SKLAND_RETRY_ROUNDS  - 网络错误/5xx/限流失败的账号在本轮结束后集中重试的轮数，0 关闭（默认 2）
+    SKLAND_RETRY_BACKOFF - 第一轮重试前的等待秒数，之后每轮翻倍（默认 5）
+    SKLAND_TRACE_SIZE    - 每个账号在内存中保留的最近请求/响应条数，仅在该账号失败时输出，0 关闭（默认 20）
+    SKLAND_PAGE_BYTES    - 单条推送的字节上限，超过时拆分为汇总页 + 明细页，0 不拆分，最小 128（默认 4000）
+
+多节点协调（可选，多台主机共同处理同一批账号时使用）:
+    SKLAND_LEASE_DB     - 共享 SQLite 文件路径，设置后启用分片租约模式
+    SKLAND_NODE_ID      - 节点标识（默认 主机名-进程号）
+    SKLAND_LEASE_SHARDS - 账号分片数，各节点必须一致（默认 8）
+    SKLAND_LEASE_TTL    - 租约有效期秒数（默认 120）
 
 也兼容 config.yaml 配置文件，环境变量优先级更高。
 """
@@ -15,8 +31,12 @@
 import asyncio
 import os
 import logging
-from skland_api import SklandAPI
-from skland_notify import send_notification
+from collections import deque
+from skland_api import SklandAPI, SklandRetryableError, capture, format_trace
+from skland_lease import LeaseCoordinator
+from skland_notify import send_pages
+from skland_pipeline import LoopStallMonitor, Pipeline, Stage
+from skland_report import MIN_PAGE_BYTES, STATUS_FAILED, SignInSummary, classify, format_result, render_pages
 
 # 初始化基础日志
 logging.basicConfig(
@@ -26,6 +46,29 @@ logging.basicConfig(
 logger = logging.getLogger("SklandSign")
 
 
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name, "").strip()
+    try:
+        return int(value) if value else default
+    except ValueError:
+        logger.warning("环境变量 %s=%s 不是整数，使用默认值 %d", name, value, default)
+        return default
+
+
+def _parse_stage_workers(text: str) -> dict[str, int]:
+    """解析 "auth=2,cred=2,binding=2,sign=4" 格式的阶段并发配置"""
+    workers = {}
+    for item in text.split(","):
+        name, _, value = item.partition("=")
+        if not name.strip() or not value.strip():
+            continue
+        try:
+            workers[name.strip()] = int(value)
+        except ValueError:
+            logger.warning("阶段并发配置无效: %s", item)
+    return workers
+
+
 def load_config_from_env():
     """从环境变量加载配置（青龙面板标准方式）"""
     token_str = os.environ.get("SKLAND_TOKEN", "").strip()
@@ -47,16 +90,36 @@ def load_config_from_env():
         "users": users,
         "qmsg_key": os.environ.get("QMSG_KEY", ""),
         "log_level": os.environ.get("LOG_LEVEL", "info"),
+        "report_detail": os.environ.get("SKLAND_REPORT_DETAIL", "1").strip().lower() not in ("0", "false", "no"),
+        "prewarm": os.environ.get("SKLAND_PREWARM", "1").strip().lower() not in ("0", "false", "no"),
+        "stage_workers": _parse_stage_workers(os.environ.get("SKLAND_STAGE_WORKERS", "")),
+        "queue_size": _env_int("SKLAND_QUEUE_SIZE", 8),
+        "crypto_workers": _env_int("SKLAND_CRYPTO_WORKERS", 0),
+        "stall_threshold_ms": _env_int("SKLAND_STALL_THRESHOLD_MS", 200),
+        "retry_rounds": _env_int("SKLAND_RETRY_ROUNDS", 2),
+        "retry_backoff": _env_int("SKLAND_RETRY_BACKOFF", 5),
+        "trace_size": _env_int("SKLAND_TRACE_SIZE", 20),
+        "page_bytes": _env_int("SKLAND_PAGE_BYTES", 4000),
+        "lease_db": os.environ.get("SKLAND_LEASE_DB", "").strip(),
+        "node_id": os.environ.get("SKLAND_NODE_ID", "").strip(),
+        "lease_shards": _env_int("SKLAND_LEASE_SHARDS", 8),
+        "lease_ttl": _env_int("SKLAND_LEASE_TTL", 120),
     }
 
-    logger.info(f"从环境变量加载配置，共 {len(users)} 个账号")
-    # 启动时打印读取到的账号信息，方便排查环境变量是否配置正确
-    for i, u in enumerate(users, 1):
-        token_preview = u['token'][:6] + "..." if u['token'] else "(空)"
-        logger.info(f"  账号{i}: 昵称={u['nickname']}, Token={token_preview}")
+    logger.info("从环境变量加载配置，共 %d 个账号", len(users))
     return config
 
 
+def log_users(users: list[dict]):
+    """debug 等级下打印读取到的账号信息，方便排查配置是否正确"""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    for i, u in enumerate(users, 1):
+        token = u.get('token', "")
+        token_preview = token[:6] + "..." if token else "(空)"
+        logger.debug("  账号%d: 昵称=%s, Token=%s", i, u.get('nickname', f"账号{i}"), token_preview)
+
+
 def load_config_from_file():
     """从 config.yaml 文件加载配置（向后兼容）"""
     try:
@@ -91,6 +154,206 @@ def load_config():
     return None
 
 
+class LeaseLostError(Exception):
+    """分片租约已被其他节点接管，尚未签到的账号交给接管的节点处理"""
+
+
+class AccountJob:
+    """流水线中的单个账号任务"""
+
+    __slots__ = ("index", "nickname", "token", "auth_code", "cred", "bindings", "results", "trace")
+
+    def __init__(self, index: int, user: dict, trace_size: int = 0):
+        self.index = index
+        self.nickname = user.get("nickname", f"账号{index}")
+        self.token = user.get("token", "")
+        # 最近的请求/响应记录，只在该账号失败时输出
+        self.trace = deque(maxlen=trace_size) if trace_size > 0 else None
+        self.auth_code = ""
+        self.cred = None
+        self.bindings = []
+        self.results = []
+
+    def reset(self):
+        """清空中间状态，以便从授权阶段重新开始"""
+        self.auth_code = ""
+        self.cred = None
+        self.bindings = []
+        self.results = []
+        return self
+
+
+def build_pipeline(
+    api: SklandAPI, config: dict, on_done, defer_sign: bool = False, should_continue=None
+) -> Pipeline:
+    """
+    构建 授权 → 凭证 → 绑定 → 签到 四个阶段的流水线
+
+    已有凭证和待签绑定的任务（签到阶段部分失败后重试）会跳过前三个阶段。
+    defer_sign 为 True 时，签到阶段可重试的失败绑定留在 job.bindings 中等待下一轮。
+    should_continue 返回 False 后，已在队列中的任务在授权和签到前以 LeaseLostError 结束。
+    """
+
+    def check_lease():
+        if should_continue is not None and not should_continue():
+            raise LeaseLostError("分片租约已丢失")
+
+    async def stage_auth(job: AccountJob):
+        check_lease()
+        if job.cred is not None:
+            return
+        logger.info("正在处理: %s", job.nickname)
+        if not job.token:
+            raise ValueError("缺少Token")
+        with capture(job.trace):
+            job.auth_code = await api.get_authorization(job.token)
+
+    async def stage_cred(job: AccountJob):
+        if job.cred is not None:
+            return
+        with capture(job.trace):
+            job.cred = await api.get_credential(job.auth_code)
+
+    async def stage_binding(job: AccountJob):
+        if job.bindings:
+            return
+        with capture(job.trace):
+            job.bindings = await api.get_binding_list(job.cred)
+
+    async def stage_sign(job: AccountJob):
+        check_lease()
+        deferred = [] if defer_sign else None
+        with capture(job.trace):
+            job.results.extend(await api.sign_bindings(job.cred, job.bindings, deferred))
+        job.bindings = deferred or []
+
+    workers = config.get("stage_workers") or {}
+    queue_size = int(config.get("queue_size", 8))
+    stages = [
+        Stage(name, handler, workers=int(workers.get(name, 1)), queue_size=queue_size)
+        for name, handler in (
+            ("auth", stage_auth),
+            ("cred", stage_cred),
+            ("binding", stage_binding),
+            ("sign", stage_sign),
+        )
+    ]
+    return Pipeline(stages, on_done)
+
+
+def flush_trace(job: AccountJob):
+    """账号失败时输出其最近的请求/响应记录"""
+    if not job.trace:
+        return
+    logger.warning("  [%s] 最近 %d 条请求记录:", job.nickname, len(job.trace))
+    for line in format_trace(job.trace):
+        logger.warning("    %s", line)
+    job.trace.clear()
+
+
+def finish_account(job: AccountJob, error: Exception | None, summary: SignInSummary) -> list[str]:
+    """汇总单个账号的结果，计入 summary，返回该账号的明细行"""
+    lines = [f"[{job.index}] {job.nickname}"]
+
+    if not job.token:
+        logger.error("  [%s] 未配置 Token", job.nickname)
+        summary.add_account(error=True)
+        lines.append("  错误: 缺少Token")
+        return lines
+
+    if error is not None:
+        error_msg = str(error)
+        logger.error("  [%s] 异常: %s", job.nickname, error_msg)
+        summary.add_account(error=True)
+        lines.append(f"  错误: {error_msg}")
+        flush_trace(job)
+        return lines
+
+    summary.add_account(no_roles=not job.results)
+    if not job.results:
+        lines.append("  未找到绑定角色")
+        logger.warning("  [%s] 未找到角色", job.nickname)
+
+    failed = False
+    for r in job.results:
+        status = summary.add(r)
+        failed = failed or status == STATUS_FAILED
+        line = format_result(r, status)
+        lines.append(line)
+        logger.info("  [%s] %s", job.nickname, line.strip())
+
+    if failed:
+        flush_trace(job)
+    return lines
+
+
+async def run_coordinated(
+    coordinator: LeaseCoordinator,
+    users: list[dict],
+    run_round,
+    retry_rounds: int,
+    wait_retry,
+    trace_size: int = 0,
+):
+    """
+    多节点模式：领取分片租约，只处理本节点领到的账号
+
+    主轮依次处理各分片，可重试的失败账号按分片暂存；所有分片处理完后统一等待退避，
+    再重新领取这些分片集中重试，避免每个分片持有租约空等。
+    """
+    shards: dict[int, list[tuple[int, dict]]] = {}
+    for index, user in enumerate(users, 1):
+        shards.setdefault(coordinator.shard_of(user.get("token", "")), []).append((index, user))
+
+    async def run_shard(lease, jobs: list[AccountJob], attempt: int) -> list[AccountJob]:
+        # 租约丢失后停止投递新账号（包括重试轮），避免与接管的节点重复签到
+        deferred = await run_round(jobs, attempt, lambda: not lease.lost)
+
+        # 有账号未成功时不标记分片完成，留给重试轮、其他节点或下一次运行
+        remaining = [job for job in jobs if not await coordinator.is_done(job.token)]
+        if remaining:
+            lease.incomplete = True
+            logger.warning("分片 %d 有 %d 个账号未成功，留待重试", lease.shard, len(remaining))
+        return [] if lease.lost else deferred
+
+    logger.info("多节点模式: 节点 %s，共 %d 个分片", coordinator.node_id, coordinator.shards)
+    retry: dict[int, list[AccountJob]] = {}
+    while True:
+        shard, waiting = await coordinator.acquire()
+        if shard is None:
+            if not waiting:
+                break
+            # 其他节点仍持有租约，等待其完成或过期后接管
+            await asyncio.sleep(coordinator.poll_interval)
+            continue
+
+        accounts = shards.get(shard, [])
+        logger.info("领取分片 %d，%d 个账号", shard, len(accounts))
+        async with coordinator.hold(shard) as lease:
+            jobs = [
+                AccountJob(index, user, trace_size) for index, user in accounts
+                if not await coordinator.is_done(user.get("token", ""))
+            ]
+            deferred = await run_shard(lease, jobs, 0)
+        if deferred:
+            retry[shard] = deferred
+
+    for attempt in range(1, retry_rounds + 1):
+        if not retry:
+            break
+        await wait_retry(attempt, sum(len(jobs) for jobs in retry.values()))
+        pending, retry = retry, {}
+        for shard, jobs in pending.items():
+            if not await coordinator.reacquire(shard):
+                logger.info("分片 %d 已被其他节点领取，跳过 %d 个待重试账号", shard, len(jobs))
+                continue
+            async with coordinator.hold(shard) as lease:
+                jobs = [job for job in jobs if not await coordinator.is_done(job.token)]
+                deferred = await run_shard(lease, jobs, attempt)
+            if deferred:
+                retry[shard] = deferred
+
+
 async def run_sign_in():
     # 1. 加载配置
     config = load_config()
@@ -102,82 +365,129 @@ async def run_sign_in():
     log_level = logging.DEBUG if user_log_level == "debug" else logging.WARNING
     for lib in ["httpx", "httpcore", "skland_api", "Qmsg"]:
         logging.getLogger(lib).setLevel(log_level)
+    logger.setLevel(logging.DEBUG if user_log_level == "debug" else logging.INFO)
 
     users = config.get("users", [])
+    log_users(users)
     qmsg_key = config.get("qmsg_key", "")
+    report_detail = config.get("report_detail", True)
 
     if not users:
         logger.warning("配置中没有发现用户信息")
         return
 
-    api = SklandAPI(max_retries=3)
-
-    # 3. 准备消息头部
-    notify_lines = ["森空岛签到报告", ""]
-
-    logger.info(f"开始执行签到任务，共 {len(users)} 个账号")
-
-    for index, user in enumerate(users, 1):
-        nickname_cfg = user.get("nickname", f"账号{index}")
-        token = user.get("token", "")
-
-        user_header = f"[{index}] {nickname_cfg}"
-        notify_lines.append(user_header)
-        logger.info(f"正在处理: {nickname_cfg}")
-
-        if not token:
-            logger.error(f"  [{nickname_cfg}] 未配置 Token")
-            notify_lines.append("  错误: 缺少Token")
-            notify_lines.append("")
-            continue
-
-        try:
-            results, official_nickname = await api.do_full_sign_in(token)
-
-            if not results:
-                notify_lines.append("  未找到绑定角色")
-                logger.warning(f"  [{nickname_cfg}] 未找到角色")
-
-            for r in results:
-                is_signed_already = not r.success and any(
-                    k in r.error for k in ["已签到", "重复", "already"]
-                )
-
-                if r.success:
-                    status_text = "成功"
-                    detail = f" ({', '.join(r.awards)})" if r.awards else ""
-                elif is_signed_already:
-                    status_text = "已签"
-                    detail = ""
-                else:
-                    status_text = "失败"
-                    detail = f" ({r.error})"
-
-                line = f"  {r.game}: {status_text}{detail}"
-                notify_lines.append(line)
-                logger.info(f"  - {line.strip()}")
-
-        except Exception as e:
-            error_msg = str(e)
-            logger.error(f"  [{nickname_cfg}] 异常: {error_msg}")
-            notify_lines.append(f"  错误: {error_msg}")
-
-        notify_lines.append("")
+    page_bytes = int(config.get("page_bytes", 4000))
+    if 0 < page_bytes < MIN_PAGE_BYTES:
+        logger.warning("单页字节上限 %d 过小，使用最小值 %d", page_bytes, MIN_PAGE_BYTES)
+        page_bytes = MIN_PAGE_BYTES
+    retry_rounds = max(0, int(config.get("retry_rounds", 2)))
+    retry_backoff = float(config.get("retry_backoff", 5))
+    trace_size = int(config.get("trace_size", 20))
+
+    api = SklandAPI(
+        max_retries=3,
+        # 启用延后重试时，可重试的错误不在请求内反复重试，避免单个账号占住流水线
+        defer_retryable=retry_rounds > 0,
+        prewarm=config.get("prewarm", True),
+        crypto_workers=int(config.get("crypto_workers", 0)),
+    )
+    stall_monitor = None
+    stall_threshold_ms = int(config.get("stall_threshold_ms", 200))
+    if stall_threshold_ms > 0:
+        stall_monitor = LoopStallMonitor(stall_threshold_ms / 1000)
+        stall_monitor.start()
+    summary = SignInSummary()
+    details: dict[int, list[str]] = {}
+    coordinator = None
+    if config.get("lease_db"):
+        coordinator = LeaseCoordinator(
+            config["lease_db"],
+            node_id=config.get("node_id", ""),
+            shards=int(config.get("lease_shards", 8)),
+            ttl=float(config.get("lease_ttl", 120)),
+        )
+
+    async def on_done(job: AccountJob, error: Exception | None):
+        lines = finish_account(job, error, summary)
+        if report_detail:
+            details[job.index] = lines
+        # 只有签到成功或已签的账号才记为今日完成，失败的账号留给其他节点/下次运行
+        succeeded = error is None and job.token and all(classify(r) != STATUS_FAILED for r in job.results)
+        if coordinator and succeeded:
+            await coordinator.mark_done(job.token)
+
+    async def run_round(jobs, attempt: int, should_continue=None) -> list[AccountJob]:
+        """执行一轮流水线，返回可重试、需要延后处理的任务；最后一轮不再延后"""
+        final = attempt >= retry_rounds
+        deferred: list[AccountJob] = []
+
+        async def on_round_done(job: AccountJob, error: Exception | None):
+            if isinstance(error, LeaseLostError):
+                # 未签到的账号由接管分片的节点处理，不计入本节点报告
+                return
+            # 可重试的失败先放入延后队列，本轮结束后再集中处理
+            if not final:
+                if isinstance(error, SklandRetryableError):
+                    # 授权/凭证/绑定阶段失败，下一轮从头开始
+                    logger.warning("  [%s] 暂时失败，稍后重试: %s", job.nickname, error)
+                    deferred.append(job.reset())
+                    return
+                if error is None and job.bindings:
+                    # 签到阶段部分失败，保留已成功的结果，下一轮只重签失败的绑定
+                    logger.warning("  [%s] %d 个绑定签到暂时失败，稍后重试", job.nickname, len(job.bindings))
+                    deferred.append(job)
+                    return
+            await on_done(job, error)
+
+        if should_continue is not None:
+            jobs = (job for job in jobs if should_continue())
+        pipeline = build_pipeline(
+            api, config, on_round_done, defer_sign=not final, should_continue=should_continue
+        )
+        await pipeline.run(jobs)
+        for line in pipeline.report():
+            logger.info(line)
+        return deferred
+
+    async def wait_retry(attempt: int, count: int):
+        delay = retry_backoff * 2 ** (attempt - 1)
+        logger.info("第 %d 轮重试: %d 个账号，%.0f 秒后开始", attempt, count, delay)
+        await asyncio.sleep(delay)
+
+    logger.info("开始执行签到任务，共 %d 个账号", len(users))
+
+    if coordinator:
+        await run_coordinated(coordinator, users, run_round, retry_rounds, wait_retry, trace_size)
+    else:
+        jobs = (AccountJob(index, user, trace_size) for index, user in enumerate(users, 1))
+        for attempt in range(retry_rounds + 1):
+            if attempt:
+                await wait_retry(attempt, len(jobs))
+            jobs = await run_round(jobs, attempt)
+            if not jobs:
+                break
 
     await api.close()
-
-    # 4. 发送推送（自动适配青龙面板通知 / Qmsg酱）
-    while notify_lines and notify_lines[-1] == "":
-        notify_lines.pop()
-
-    final_message = "\n".join(notify_lines)
+    if stall_monitor:
+        await stall_monitor.stop()
+        logger.info(stall_monitor.report())
+
+    # 3. 组装报告：汇总在前，明细可选；超过单条上限时拆分为汇总页 + 明细页
+    detail_blocks = ["\n".join(details[index]) for index in sorted(details)]
+    pages = render_pages(
+        "森空岛签到报告",
+        summary.render(),
+        detail_blocks,
+        page_bytes,
+    )
 
     # 打印完整结果到控制台（青龙面板会捕获标准输出作为日志）
     print("\n" + "=" * 40)
-    print(final_message)
+    print("\n\n".join(pages))
     print("=" * 40 + "\n")
 
-    await send_notification("森空岛签到", final_message, qmsg_key)
+    # 4. 发送推送（自动适配青龙面板通知 / Qmsg酱），多页时并发推送
+    await send_pages("森空岛签到", pages, qmsg_key)
 
     logger.info("所有任务已完成")
 
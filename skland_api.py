@@ -3,17 +3,23 @@ Skland API - Ported from Rust implementation
 Handles device ID generation, authentication, and sign-in flow
 """
 
+import asyncio
 import base64
 import gzip
 import hashlib
 import hmac
 import json
 import logging
+import sys
 import time
 import uuid
-from dataclasses import dataclass, field
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
 from datetime import datetime
-from typing import Any
+from typing import Any, Callable
 from urllib.parse import urlparse
 
 import httpx
@@ -80,20 +86,125 @@ BROWSER_ENV = {
     "status": "0011",
 }
 
+# Hosts contacted after the device ID request, warmed up in the background.
+# fp-it.portal101.cn is left out: the device ID POST goes there immediately and
+# would otherwise race its own warm-up for a second connection.
+PREWARM_HOSTS = ("as.hypergryph.com", "zonai.skland.com")
+
+# Response messages that indicate upstream throttling
+THROTTLE_KEYWORDS = ("频繁", "稍后再试", "限流", "too many", "rate limit")
+
 RSA_PUBLIC_KEY = "MIGfMA0GCSqGSIb3DQEBAQUAA4GNADCBiQKBgQCmxMNr7n8ZeT0tE1R9j/mPixoinPkeM+k4VGIn/s0k7N5rJAfnZ0eMER+QhwFvshzo0LNmeUkpR8uIlU/GEVr8mN28sKmwd2gpygqj0ePnBmOW4v0ZVwbSYK+izkhVFk2V/doLoMbWy6b+UnA8mkjvg0iYWRByfRsK2gdl7llqCwIDAQAB"
 
 
-@dataclass
+# Keys whose string values are masked when a trace is written out
+TRACE_REDACT_KEYS = ("token", "cred", "code")
+
+# Request/response bodies in a trace are cut to this many characters
+TRACE_BODY_LIMIT = 500
+
+# Per-account ring buffer of request/response records, set by capture()
+_trace_buffer: ContextVar[deque | None] = ContextVar("skland_trace_buffer", default=None)
+
+
+@contextmanager
+def capture(buffer: deque | None):
+    """Record requests made inside this block into buffer (a bounded deque)"""
+    token = _trace_buffer.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _trace_buffer.reset(token)
+
+
+def _tracing() -> bool:
+    return _trace_buffer.get() is not None
+
+
+def _record(method: str, url: str, request: dict | None, status: int | None, payload: Any):
+    buffer = _trace_buffer.get()
+    if buffer is not None:
+        buffer.append((time.time(), method, url, request, status, payload))
+
+
+def _redact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            k: "***" if k in TRACE_REDACT_KEYS and isinstance(v, str) else _redact(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [_redact(v) for v in value]
+    return value
+
+
+def format_trace(buffer: deque) -> list[str]:
+    """Format captured records as log lines, masking credentials"""
+    def clip(value: Any) -> str:
+        text = value if isinstance(value, str) else json.dumps(_redact(value), ensure_ascii=False)
+        return text if len(text) <= TRACE_BODY_LIMIT else text[:TRACE_BODY_LIMIT] + "..."
+
+    lines = []
+    for ts, method, url, request, status, payload in buffer:
+        stamp = datetime.fromtimestamp(ts).strftime("%H:%M:%S.%f")[:-3]
+        sent = f" {clip(request)}" if request is not None else ""
+        body = clip(payload)
+        lines.append(f"{stamp} {method} {url}{sent} -> {status if status is not None else 'ERR'} {body}")
+    return lines
+
+
+class SklandRetryableError(Exception):
+    """Transient failure (transport error, 5xx, throttling) that may succeed if retried later"""
+
+
+def _is_throttled(message: str) -> bool:
+    """Check if an API error message indicates upstream throttling"""
+    lowered = message.lower()
+    return any(keyword in lowered for keyword in THROTTLE_KEYWORDS)
+
+
+def _api_error(message: str) -> Exception:
+    """Build the exception for a failed API response, retryable if throttled"""
+    if _is_throttled(message):
+        return SklandRetryableError(message)
+    return Exception(message)
+
+
+@dataclass(slots=True)
 class SignInResult:
-    """Result of a sign-in attempt"""
+    """Result of a sign-in attempt
+
+    Slotted to keep per-result overhead small for large fleets. Game and
+    channel names are interned, awards are (name, count) tuples.
+    """
 
     success: bool
     game: str
     nickname: str
     channel: str
-    awards: list[str] = field(default_factory=list)
+    awards: tuple[tuple[str, int], ...] = ()
     error: str = ""
 
+    def __post_init__(self):
+        # Upstream JSON may carry null names; only strings can be interned
+        if isinstance(self.game, str):
+            self.game = sys.intern(self.game)
+        if isinstance(self.channel, str):
+            self.channel = sys.intern(self.channel)
+
+    def format_awards(self) -> str:
+        """Format awards as "name x count" text"""
+        return ", ".join(f"{name}x{count}" for name, count in self.awards)
+
+
+def _make_award(name: str, count: Any) -> tuple[str, int]:
+    """Build an interned (name, count) award tuple"""
+    try:
+        count = int(count)
+    except (TypeError, ValueError):
+        count = 1
+    return sys.intern(str(name)), count
+
 
 @dataclass
 class UserBinding:
@@ -119,10 +230,28 @@ class Credential:
 class SklandAPI:
     """Skland API client"""
 
-    def __init__(self, max_retries: int = 3):
+    def __init__(
+        self,
+        max_retries: int = 3,
+        prewarm: bool = True,
+        crypto_workers: int = 0,
+        defer_retryable: bool = False,
+    ):
         self.max_retries = max_retries
+        # defer_retryable raises SklandRetryableError after the first attempt so the
+        # caller can retry later; other errors still get max_retries inline attempts
+        self.defer_retryable = defer_retryable
+        self.prewarm = prewarm
+        self._prewarm_tasks: list[asyncio.Task] = []
+        # crypto_workers > 0 moves device fingerprint work off the event loop
+        self._crypto_executor: ThreadPoolExecutor | None = (
+            ThreadPoolExecutor(max_workers=crypto_workers, thread_name_prefix="skland-crypto")
+            if crypto_workers > 0
+            else None
+        )
         self._client: httpx.AsyncClient | None = None
         self._did: str | None = None
+        self._did_lock = asyncio.Lock()
 
     def _is_signed_today(self, result: SignInResult) -> bool:
         """Check if the result indicates already signed today"""
@@ -140,9 +269,23 @@ class SklandAPI:
         return self._client
 
     async def close(self):
+        for task in self._prewarm_tasks:
+            task.cancel()
+        await asyncio.gather(*self._prewarm_tasks, return_exceptions=True)
+        self._prewarm_tasks = []
         if self._client:
             await self._client.aclose()
             self._client = None
+        if self._crypto_executor:
+            self._crypto_executor.shutdown(wait=False)
+            self._crypto_executor = None
+
+    async def _run_crypto(self, func: Callable, *args) -> Any:
+        """Run CPU-bound crypto in the crypto executor, or inline when none is configured"""
+        if self._crypto_executor is None:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._crypto_executor, func, *args)
 
     async def _request(
         self,
@@ -161,19 +304,54 @@ class SklandAPI:
                     resp = await client.get(url, headers=headers)
                 else:
                     resp = await client.post(url, headers=headers, json=json_data)
-                return resp.json()
+                if resp.status_code >= 500 or resp.status_code == 429:
+                    if _tracing():
+                        _record(method, url, json_data, resp.status_code, resp.text[:TRACE_BODY_LIMIT])
+                    raise SklandRetryableError(f"HTTP {resp.status_code}: {urlparse(url).netloc}")
+                try:
+                    data = resp.json()
+                except ValueError as e:
+                    if _tracing():
+                        _record(method, url, json_data, resp.status_code, resp.text[:TRACE_BODY_LIMIT])
+                    # HTML error / WAF pages instead of JSON are usually transient
+                    raise SklandRetryableError(
+                        f"响应解析失败 HTTP {resp.status_code}: {urlparse(url).netloc}"
+                    ) from e
+                _record(method, url, json_data, resp.status_code, data)
+                return data
+            except httpx.TransportError as e:
+                last_error = SklandRetryableError(f"网络错误: {type(e).__name__} {e}".strip())
+                last_error.__cause__ = e
+                _record(method, url, json_data, None, str(last_error))
+            except SklandRetryableError as e:
+                # Already recorded with the real status and body above
+                last_error = e
             except Exception as e:
                 last_error = e
-                if attempt < self.max_retries:
-                    await self._sleep(1)
+                _record(method, url, json_data, None, f"{type(e).__name__}: {e}")
+
+            if self.defer_retryable and isinstance(last_error, SklandRetryableError):
+                break
+            if attempt < self.max_retries:
+                await self._sleep(1)
 
         raise last_error or Exception(f"Request failed after {self.max_retries} attempts")
 
     async def _sleep(self, seconds: float):
-        import asyncio
-
         await asyncio.sleep(seconds)
 
+    async def _warm(self, host: str):
+        client = await self._get_client()
+        try:
+            await client.head(f"https://{host}/", timeout=5.0)
+        except httpx.HTTPError as e:
+            logger.debug("Prewarm %s failed: %s", host, e)
+
+    def _start_prewarm(self):
+        """Resolve DNS and open TLS connections to the API hosts in the background"""
+        if not self._prewarm_tasks:
+            self._prewarm_tasks = [asyncio.create_task(self._warm(host)) for host in PREWARM_HOSTS]
+
     # ==================== Device ID Generation ====================
 
     def _des_encrypt(self, key: bytes, data: bytes) -> bytes:
@@ -248,11 +426,8 @@ class SklandAPI:
         suffix = smsk_web[:7].hex()
         return f"{v}{suffix}0"
 
-    async def get_device_id(self) -> str:
-        """Generate device ID (dId)"""
-        if self._did:
-            return self._did
-
+    def _build_device_profile(self) -> dict:
+        """Build the encrypted device profile request body (CPU-bound)"""
         # Generate UUID and priId
         uid = str(uuid.uuid4())
         pri_id_hash = hashlib.md5(uid.encode()).digest()[:8]
@@ -290,26 +465,48 @@ class SklandAPI:
         # AES encrypt
         encrypted = self._aes_encrypt(compressed, pri_id_hex.encode())
 
+        return {
+            "appId": "default",
+            "compress": 2,
+            "data": encrypted,
+            "encode": 5,
+            "ep": ep_base64,
+            "organization": "UWXspnCCJN4sfYlNfqps",
+            "os": "web",
+        }
+
+    async def get_device_id(self) -> str:
+        """Generate device ID (dId)"""
+        if self._did:
+            return self._did
+
+        # Concurrent callers share a single device ID generation
+        async with self._did_lock:
+            if self._did:
+                return self._did
+            self._did = await self._generate_device_id()
+        return self._did
+
+    async def _generate_device_id(self) -> str:
+        if self.prewarm:
+            # Warm-ups run in the background; only the fingerprint is awaited, so a slow
+            # host never delays the device ID request. Yield once so they are in flight
+            # before the (possibly inline) fingerprint work starts.
+            self._start_prewarm()
+            await asyncio.sleep(0)
+        profile = await self._run_crypto(self._build_device_profile)
+
         # Request device ID
         response = await self._request(
             "POST",
             "https://fp-it.portal101.cn/deviceprofile/v4",
-            json_data={
-                "appId": "default",
-                "compress": 2,
-                "data": encrypted,
-                "encode": 5,
-                "ep": ep_base64,
-                "organization": "UWXspnCCJN4sfYlNfqps",
-                "os": "web",
-            },
+            json_data=profile,
         )
 
         if response.get("code") != 1100:
             raise Exception(f"Device ID generation failed: {response}")
 
-        self._did = f"B{response['detail']['deviceId']}"
-        return self._did
+        return f"B{response['detail']['deviceId']}"
 
     # ==================== Authentication ====================
 
@@ -355,7 +552,7 @@ class SklandAPI:
         )
 
         if response.get("status") != 0:
-            raise Exception(f"Authorization failed: {response.get('message', 'Unknown error')}")
+            raise _api_error(f"Authorization failed: {response.get('message', 'Unknown error')}")
 
         return response["data"]["code"]
 
@@ -372,7 +569,7 @@ class SklandAPI:
         )
 
         if response.get("code") != 0:
-            raise Exception(f"Credential failed: {response.get('message', 'Unknown error')}")
+            raise _api_error(f"Credential failed: {response.get('message', 'Unknown error')}")
 
         data = response["data"]
         return Credential(token=data["token"], cred=data["cred"])
@@ -390,6 +587,7 @@ class SklandAPI:
         path = parsed.path
         query = parsed.query or ""
 
+        # Signing stays inline: HMAC/MD5 over a short string costs ~10us, an executor round-trip ~50us
         if method.upper() == "GET":
             sign, header_ca = self._generate_signature(cred.token, path, query, did)
         else:
@@ -416,7 +614,7 @@ class SklandAPI:
             msg = response.get("message", "Unknown error")
             if msg == "用户未登录":
                 raise Exception("用户登录已过期，请重新登录")
-            raise Exception(f"获取绑定列表失败: {msg}")
+            raise _api_error(f"获取绑定列表失败: {msg}")
 
         bindings = []
         for item in response.get("data", {}).get("list", []):
@@ -440,7 +638,7 @@ class SklandAPI:
         return bindings
 
     async def sign_arknights(self, cred: Credential, binding: UserBinding) -> SignInResult:
-        """Sign in for Arknights"""
+        """Sign in for Arknights; a throttled response raises SklandRetryableError"""
         did = await self.get_device_id()
         url = "https://zonai.skland.com/api/v1/game/attendance"
         body = json.dumps({"gameId": binding.game_id, "uid": binding.uid}, separators=(",", ":"))
@@ -453,23 +651,26 @@ class SklandAPI:
             json_data={"gameId": binding.game_id, "uid": binding.uid},
         )
 
-        # Log the response for debugging
-        logger.info(f"[明日方舟] {binding.nickname} sign-in response: {json.dumps(response, ensure_ascii=False)}")
+        # Full response is kept in the trace buffer; formatted only if debug logging is on
+        logger.debug("[明日方舟] %s sign-in response: %s", binding.nickname, response)
 
         if response.get("code") != 0:
+            message = response.get("message", "Unknown error")
+            if _is_throttled(message):
+                # Left to sign_bindings, which defers the binding or reports the failure
+                raise SklandRetryableError(message)
             return SignInResult(
                 success=False,
                 game="明日方舟",
                 nickname=binding.nickname,
                 channel=binding.channel_name,
-                error=response.get("message", "Unknown error"),
+                error=message,
             )
 
-        awards = []
-        for award in response.get("data", {}).get("awards", []):
-            name = award.get("resource", {}).get("name", "Unknown")
-            count = award.get("count", 1)
-            awards.append(f"{name}x{count}")
+        awards = tuple(
+            _make_award(award.get("resource", {}).get("name", "Unknown"), award.get("count", 1))
+            for award in response.get("data", {}).get("awards", [])
+        )
 
         return SignInResult(
             success=True,
@@ -479,9 +680,18 @@ class SklandAPI:
             awards=awards,
         )
 
-    async def sign_endfield(self, cred: Credential, binding: UserBinding) -> list[SignInResult]:
-        """Sign in for Endfield (multiple roles)"""
+    async def sign_endfield(
+        self, cred: Credential, binding: UserBinding, deferred: list[UserBinding] | None = None
+    ) -> list[SignInResult]:
+        """
+        Sign in for Endfield (multiple roles)
+
+        Roles that fail with a retryable error or a throttled response are appended to
+        deferred as a binding holding only those roles; without deferred they are
+        reported as failures.
+        """
         results = []
+        failed_roles = []
         roles = binding.roles
 
         if not roles:
@@ -509,21 +719,38 @@ class SklandAPI:
             headers["referer"] = "https://game.skland.com/"
             headers["origin"] = "https://game.skland.com/"
 
-            client = await self._get_client()
-            resp = await client.post(url, headers=headers)
-            response = resp.json()
+            try:
+                response = await self._request("POST", url, headers=headers)
+            except SklandRetryableError as e:
+                if deferred is not None:
+                    failed_roles.append(role)
+                else:
+                    results.append(
+                        SignInResult(
+                            success=False,
+                            game="终末地",
+                            nickname=role_nickname,
+                            channel=binding.channel_name,
+                            error=str(e),
+                        )
+                    )
+                continue
 
-            # Log the response for debugging
-            logger.info(f"[终末地] {role_nickname} sign-in response: {json.dumps(response, ensure_ascii=False)}")
+            # Full response is kept in the trace buffer; formatted only if debug logging is on
+            logger.debug("[终末地] %s sign-in response: %s", role_nickname, response)
 
             if response.get("code") != 0:
+                message = response.get("message", "Unknown error")
+                if deferred is not None and _is_throttled(message):
+                    failed_roles.append(role)
+                    continue
                 results.append(
                     SignInResult(
                         success=False,
                         game="终末地",
                         nickname=role_nickname,
                         channel=binding.channel_name,
-                        error=response.get("message", "Unknown error"),
+                        error=message,
                     )
                 )
                 continue
@@ -536,9 +763,7 @@ class SklandAPI:
                 aid = award.get("id", "")
                 if aid in resource_map:
                     info = resource_map[aid]
-                    name = info.get("name", "Unknown")
-                    count = info.get("count", 1)
-                    awards.append(f"{name}x{count}")
+                    awards.append(_make_award(info.get("name", "Unknown"), info.get("count", 1)))
 
             results.append(
                 SignInResult(
@@ -546,10 +771,13 @@ class SklandAPI:
                     game="终末地",
                     nickname=role_nickname,
                     channel=binding.channel_name,
-                    awards=awards,
+                    awards=tuple(awards),
                 )
             )
 
+        if failed_roles:
+            deferred.append(replace(binding, roles=failed_roles))
+
         return results
 
     async def do_full_sign_in(self, user_token: str) -> tuple[list[SignInResult], str]:
@@ -571,17 +799,44 @@ class SklandAPI:
             return [], ""
 
         nickname = bindings[0].nickname if bindings else ""
+        results = await self.sign_bindings(cred, bindings)
+
+        return results, nickname
+
+    async def sign_bindings(
+        self, cred: Credential, bindings: list[UserBinding], deferred: list[UserBinding] | None = None
+    ) -> list[SignInResult]:
+        """
+        Sign in for every supported binding
+
+        Bindings that fail with a retryable error or a throttled response are appended
+        to deferred so they can be signed again later; without deferred they are
+        reported as failures.
+        Results that already succeeded are always returned.
+        """
         results = []
 
         for binding in bindings:
             if binding.app_code == "arknights":
-                result = await self.sign_arknights(cred, binding)
+                try:
+                    result = await self.sign_arknights(cred, binding)
+                except SklandRetryableError as e:
+                    if deferred is not None:
+                        deferred.append(binding)
+                        continue
+                    result = SignInResult(
+                        success=False,
+                        game="明日方舟",
+                        nickname=binding.nickname,
+                        channel=binding.channel_name,
+                        error=str(e),
+                    )
                 results.append(result)
             elif binding.app_code == "endfield":
-                endfield_results = await self.sign_endfield(cred, binding)
+                endfield_results = await self.sign_endfield(cred, binding, deferred)
                 results.extend(endfield_results)
 
-        return results, nickname
+        return results
 
     async def check_sign_in_status(self, user_token: str) -> tuple[dict[str, bool], str]:
         """
@@ -0,0 +1,255 @@
+"""
+多节点协调模块 - 基于 SQLite 租约的账号分片
+
+多台青龙主机共享同一个 SQLite 文件（放在共享存储上）。账号按 Token 哈希
+分到固定数量的分片，每个节点对分片获取有时限的租约，处理期间定时续约；
+节点宕机后租约过期，其他节点可以接管。签到成功（或已签）的账号按"签到日"
+记录，保证每个账号每天在整个集群中只成功处理一次；失败的账号不记录，
+所在分片保持未完成，由其他节点或下一次运行重试。
+
+注意: 所有节点的分片数 (SKLAND_LEASE_SHARDS) 必须一致。
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import socket
+import sqlite3
+import time
+import uuid
+from contextlib import asynccontextmanager, closing
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger("skland_lease")
+
+# 森空岛签到按北京时间自然日刷新
+_GAME_TZ = timezone(timedelta(hours=8))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    shard INTEGER PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    day TEXT NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    key TEXT NOT NULL,
+    day TEXT NOT NULL,
+    holder TEXT NOT NULL,
+    PRIMARY KEY (key, day)
+);
+"""
+
+
+def game_day() -> str:
+    """当前签到日（北京时间）"""
+    return datetime.now(_GAME_TZ).strftime("%Y-%m-%d")
+
+
+def account_key(token: str) -> str:
+    """账号标识，只保存 Token 的哈希"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class Lease:
+    """一个分片的租约"""
+
+    def __init__(self, shard: int):
+        self.shard = shard
+        self.lost = False
+        # 有账号未成功时置为 True，释放时不标记分片完成
+        self.incomplete = False
+
+
+class LeaseCoordinator:
+    """基于 SQLite 的分片租约协调器"""
+
+    def __init__(self, db_path: str, node_id: str = "", shards: int = 8, ttl: float = 120.0):
+        self.db_path = db_path
+        self.node_id = node_id or f"{socket.gethostname()}-{os.getpid()}"
+        # 租约持有者带随机后缀，即使多台主机配置了相同的 node_id 也不会互相续约/释放
+        self.holder = f"{self.node_id}#{uuid.uuid4().hex[:8]}"
+        # 本次运行已领取过的分片，未完成释放后不再重复领取
+        self._attempted: set[int] = set()
+        self.shards = max(1, shards)
+        self.ttl = max(10.0, ttl)
+        self.renew_interval = self.ttl / 3
+        self.poll_interval = self.ttl / 4
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # 每次操作独立连接，避免跨线程共享；autocommit 模式下手动控制事务
+        return sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+
+    def shard_of(self, token: str) -> int:
+        """账号所属分片"""
+        digest = hashlib.sha256(token.encode()).digest()
+        return int.from_bytes(digest[:8], "big") % self.shards
+
+    # ==================== 同步实现（在线程中执行） ====================
+
+    def _acquire(self) -> tuple[int | None, bool]:
+        day = game_day()
+        now = time.time()
+        order = list(range(self.shards))
+        random.shuffle(order)
+        waiting = False
+
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM accounts WHERE day <> ?", (day,))
+                rows = {
+                    shard: (holder, expires_at, row_day, completed)
+                    for shard, holder, expires_at, row_day, completed in conn.execute(
+                        "SELECT shard, holder, expires_at, day, completed FROM leases"
+                    )
+                }
+                for shard in order:
+                    if shard in self._attempted:
+                        continue
+                    row = rows.get(shard)
+                    if row is not None:
+                        holder, expires_at, row_day, completed = row
+                        if row_day == day:
+                            if completed:
+                                continue
+                            if expires_at > now:
+                                waiting = True
+                                continue
+                    conn.execute(
+                        "INSERT OR REPLACE INTO leases (shard, holder, expires_at, day, completed) "
+                        "VALUES (?, ?, ?, ?, 0)",
+                        (shard, self.holder, now + self.ttl, day),
+                    )
+                    conn.execute("COMMIT")
+                    self._attempted.add(shard)
+                    return shard, False
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+        return None, waiting
+
+    def _reacquire(self, shard: int) -> bool:
+        day = game_day()
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT expires_at, day, completed FROM leases WHERE shard = ?", (shard,)
+                ).fetchone()
+                if row is not None:
+                    expires_at, row_day, completed = row
+                    if row_day == day and (completed or expires_at > now):
+                        conn.execute("COMMIT")
+                        return False
+                conn.execute(
+                    "INSERT OR REPLACE INTO leases (shard, holder, expires_at, day, completed) "
+                    "VALUES (?, ?, ?, ?, 0)",
+                    (shard, self.holder, now + self.ttl, day),
+                )
+                conn.execute("COMMIT")
+                return True
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _renew(self, shard: int) -> bool:
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE leases SET expires_at = ? WHERE shard = ? AND holder = ? AND completed = 0",
+                (time.time() + self.ttl, shard, self.holder),
+            )
+            return cur.rowcount == 1
+
+    def _release(self, shard: int, completed: bool):
+        with closing(self._connect()) as conn:
+            if completed:
+                conn.execute(
+                    "UPDATE leases SET completed = 1 WHERE shard = ? AND holder = ?",
+                    (shard, self.holder),
+                )
+            else:
+                conn.execute(
+                    "UPDATE leases SET expires_at = 0 WHERE shard = ? AND holder = ?",
+                    (shard, self.holder),
+                )
+
+    def _is_done(self, key: str) -> bool:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT 1 FROM accounts WHERE key = ? AND day = ?", (key, game_day())
+            ).fetchone()
+            return row is not None
+
+    def _mark_done(self, key: str):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO accounts (key, day, holder) VALUES (?, ?, ?)",
+                (key, game_day(), self.node_id),
+            )
+
+    # ==================== 异步接口 ====================
+
+    async def acquire(self) -> tuple[int | None, bool]:
+        """
+        获取一个待处理分片的租约
+
+        Returns: (分片编号, 是否有其他节点正在处理的分片)
+                 分片编号为 None 表示当前没有可领取的分片
+        """
+        return await asyncio.to_thread(self._acquire)
+
+    async def reacquire(self, shard: int) -> bool:
+        """
+        重新领取本节点此前未完成释放的分片，用于主轮结束后的集中重试
+
+        Returns: 分片已完成或正被其他节点持有时返回 False
+        """
+        return await asyncio.to_thread(self._reacquire, shard)
+
+    async def is_done(self, token: str) -> bool:
+        """该账号今天是否已被集群中某个节点签到成功"""
+        return await asyncio.to_thread(self._is_done, account_key(token))
+
+    async def mark_done(self, token: str):
+        """记录该账号今天已签到成功"""
+        await asyncio.to_thread(self._mark_done, account_key(token))
+
+    async def _renew_loop(self, lease: Lease):
+        while True:
+            await asyncio.sleep(self.renew_interval)
+            try:
+                ok = await asyncio.to_thread(self._renew, lease.shard)
+            except sqlite3.Error as e:
+                logger.warning(f"分片 {lease.shard} 续约失败: {e}")
+                continue
+            if not ok:
+                logger.warning(f"分片 {lease.shard} 租约已被其他节点接管")
+                lease.lost = True
+                return
+
+    @asynccontextmanager
+    async def hold(self, shard: int):
+        """持有分片租约，期间后台自动续约；正常退出且没有未成功账号时标记分片完成"""
+        lease = Lease(shard)
+        renewer = asyncio.create_task(self._renew_loop(lease))
+        completed = False
+        try:
+            yield lease
+            completed = not lease.lost and not lease.incomplete
+        finally:
+            renewer.cancel()
+            try:
+                await renewer
+            except asyncio.CancelledError:
+                pass
+            if not lease.lost:
+                await asyncio.to_thread(self._release, shard, completed)
@@ -6,15 +6,22 @@
 2. Qmsg酱推送（设置环境变量 QMSG_KEY）
 3. 仅控制台输出
 
+报告过长被拆分为多页时，send_pages 会并发推送各页（同时最多 PAGE_CONCURRENCY 页，
+避免触发推送渠道限流），标题带页码，并逐页报告推送结果。
+
 注意: 本文件命名为 skland_notify.py 而非 notify.py，
      是为了避免与青龙面板自身的 /ql/scripts/notify.py 产生命名冲突。
 """
 
+import asyncio
 import logging
 import os
 
 logger = logging.getLogger("skland_notify")
 
+# 多页推送时同时进行的页数上限
+PAGE_CONCURRENCY = 2
+
 
 async def send_notification(title: str, message: str, qmsg_key: str = ""):
     """
@@ -27,8 +34,11 @@ async def send_notification(title: str, message: str, qmsg_key: str = ""):
     sent = False
 
     # 1. 青龙面板内置 QLAPI（运行时自动注入，使用系统通知设置，无需任何额外配置）
+    # QLAPI 是同步调用，放到线程中执行，避免阻塞事件循环
     try:
-        result = QLAPI.systemNotify({"title": title, "content": message})  # noqa: F821
+        result = await asyncio.to_thread(
+            lambda: QLAPI.systemNotify({"title": title, "content": message})  # noqa: F821
+        )
         if result and result.get("code") == 200:
             logger.info("青龙面板通知发送成功")
             sent = True
@@ -58,4 +68,49 @@ async def send_notification(title: str, message: str, qmsg_key: str = ""):
     return sent
 
 
+def _has_qlapi() -> bool:
+    try:
+        QLAPI  # noqa: F821, B018
+        return True
+    except NameError:
+        return False
+
+
+async def send_pages(title: str, pages: list[str], qmsg_key: str = "") -> list[bool]:
+    """
+    并发推送多页报告
+
+    :param title: 通知标题，多页时追加 "(i/n)" 页码
+    :param pages: 页面内容列表
+    :param qmsg_key: Qmsg酱 Key（可选）
+    :return: 每页是否推送成功
+    """
+    if len(pages) <= 1:
+        return [await send_notification(title, pages[0] if pages else "", qmsg_key)]
+
+    if not _has_qlapi() and not (qmsg_key or os.environ.get("QMSG_KEY", "")):
+        logger.info("未配置推送渠道，仅输出到控制台")
+        return [False] * len(pages)
+
+    total = len(pages)
+    semaphore = asyncio.Semaphore(PAGE_CONCURRENCY)
+
+    async def send_page(i: int, page: str) -> bool:
+        async with semaphore:
+            return await send_notification(f"{title} ({i}/{total})", page, qmsg_key)
+
+    results = await asyncio.gather(
+        *(send_page(i, page) for i, page in enumerate(pages, 1)),
+        return_exceptions=True,
+    )
 
+    sent = []
+    for i, result in enumerate(results, 1):
+        ok = result is True
+        if not ok:
+            reason = result if isinstance(result, Exception) else "所有渠道均未成功"
+            logger.warning(f"第 {i}/{total} 页推送失败: {reason}")
+        sent.append(ok)
+
+    logger.info(f"报告共 {total} 页，推送成功 {sum(sent)} 页")
+    return sent
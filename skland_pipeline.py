@@ -0,0 +1,151 @@
+"""
+流水线模块 - 分阶段的生产者/消费者执行引擎
+
+每个阶段拥有独立的 worker 池和有界队列，任务在各阶段之间独立流动，
+下游队列满时上游 worker 会阻塞在 put 上，从而形成背压。
+某阶段抛出异常的任务会跳过后续阶段，直接交给完成回调。
+
+LoopStallMonitor 用于检测事件循环是否被同步代码长时间阻塞。
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable
+
+logger = logging.getLogger("skland_pipeline")
+
+
+@dataclass
+class Stage:
+    """流水线阶段"""
+
+    name: str
+    handler: Callable[[Any], Awaitable[None]]
+    workers: int = 1
+    queue_size: int = 8
+
+
+@dataclass
+class StageStats:
+    """阶段运行统计"""
+
+    name: str
+    processed: int = 0
+    failed: int = 0
+    busy: float = 0.0
+    max_depth: int = 0
+
+    def format(self, elapsed: float) -> str:
+        throughput = self.processed / elapsed if elapsed > 0 else 0.0
+        return (
+            f"阶段 {self.name}: 完成 {self.processed}, 失败 {self.failed}, "
+            f"最大队列 {self.max_depth}, 吞吐 {throughput:.2f}/s, 忙碌 {self.busy:.2f}s"
+        )
+
+
+class Pipeline:
+    """分阶段执行引擎"""
+
+    def __init__(self, stages: list[Stage], on_done: Callable[[Any, Exception | None], Awaitable[None]]):
+        self.stages = stages
+        self.on_done = on_done
+        self.stats = [StageStats(stage.name) for stage in stages]
+        self.elapsed = 0.0
+
+    async def _put(self, queue: asyncio.Queue, stats: StageStats, item: Any):
+        await queue.put(item)
+        stats.max_depth = max(stats.max_depth, queue.qsize())
+
+    async def _worker(self, index: int, queues: list[asyncio.Queue]):
+        stage = self.stages[index]
+        stats = self.stats[index]
+        queue = queues[index]
+        is_last = index == len(self.stages) - 1
+
+        while True:
+            item = await queue.get()
+            try:
+                start = time.perf_counter()
+                try:
+                    await stage.handler(item)
+                except Exception as e:
+                    stats.failed += 1
+                    await self.on_done(item, e)
+                    continue
+                finally:
+                    stats.busy += time.perf_counter() - start
+
+                stats.processed += 1
+                if is_last:
+                    await self.on_done(item, None)
+                else:
+                    await self._put(queues[index + 1], self.stats[index + 1], item)
+            except Exception as e:
+                logger.error(f"阶段 {stage.name} 处理完成回调时出错: {e}")
+            finally:
+                queue.task_done()
+
+    async def run(self, items: Iterable[Any]):
+        """把 items 依次送入流水线，等待全部完成"""
+        queues = [asyncio.Queue(maxsize=max(1, stage.queue_size)) for stage in self.stages]
+        workers = [
+            asyncio.create_task(self._worker(index, queues))
+            for index, stage in enumerate(self.stages)
+            for _ in range(max(1, stage.workers))
+        ]
+        start = time.monotonic()
+        try:
+            for item in items:
+                await self._put(queues[0], self.stats[0], item)
+            # 任务只会向下游流动，按顺序等待各队列清空即可
+            for queue in queues:
+                await queue.join()
+        finally:
+            self.elapsed = time.monotonic() - start
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def report(self) -> list[str]:
+        """各阶段的统计文本行"""
+        return [stats.format(self.elapsed) for stats in self.stats]
+
+
+class LoopStallMonitor:
+    """事件循环阻塞检测：定时休眠，实际唤醒延迟超过阈值即记为一次阻塞"""
+
+    def __init__(self, threshold: float, interval: float | None = None):
+        self.threshold = threshold
+        self.interval = interval if interval is not None else max(0.01, threshold / 2)
+        self.stalls = 0
+        self.max_lag = 0.0
+        self._task: asyncio.Task | None = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = loop.time() - start - self.interval
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self.stalls += 1
+                logger.warning(f"事件循环阻塞 {lag * 1000:.0f}ms")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def report(self) -> str:
+        return (
+            f"事件循环阻塞: {self.stalls} 次 (阈值 {self.threshold * 1000:.0f}ms, "
+            f"最长 {self.max_lag * 1000:.0f}ms)"
+        )
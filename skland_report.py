@@ -0,0 +1,173 @@
+"""
+报告模块 - 签到结果分类、汇总统计与分页渲染
+
+SignInSummary 增量统计每个结果，只保留计数与奖励总数，
+不需要保存所有 SignInResult，适合大量账号。
+render_pages 在报告超过推送渠道长度限制时，拆分为汇总页与若干明细页。
+"""
+
+from collections import Counter
+
+from skland_api import SignInResult
+
+STATUS_SUCCESS = "成功"
+STATUS_SIGNED = "已签"
+STATUS_FAILED = "失败"
+
+_SIGNED_KEYWORDS = ("已签到", "重复", "already")
+
+
+def classify(result: SignInResult) -> str:
+    """判断单个签到结果的状态: 成功 / 已签 / 失败"""
+    if result.success:
+        return STATUS_SUCCESS
+    if any(k in result.error for k in _SIGNED_KEYWORDS):
+        return STATUS_SIGNED
+    return STATUS_FAILED
+
+
+def format_result(result: SignInResult, status: str) -> str:
+    """生成单个结果的明细行"""
+    if status == STATUS_SUCCESS:
+        detail = f" ({result.format_awards()})" if result.awards else ""
+    elif status == STATUS_SIGNED:
+        detail = ""
+    else:
+        detail = f" ({result.error})"
+    return f"  {result.game}: {status}{detail}"
+
+
+class SignInSummary:
+    """签到结果的增量汇总"""
+
+    __slots__ = ("accounts", "account_errors", "no_roles", "status_counts", "game_counts", "award_totals")
+
+    def __init__(self):
+        self.accounts = 0
+        self.account_errors = 0
+        self.no_roles = 0
+        self.status_counts: Counter[str] = Counter()
+        self.game_counts: dict[str, Counter[str]] = {}
+        self.award_totals: Counter[str] = Counter()
+
+    def add_account(self, error: bool = False, no_roles: bool = False):
+        """记录一个账号（异常 / 无角色）"""
+        self.accounts += 1
+        if error:
+            self.account_errors += 1
+        elif no_roles:
+            self.no_roles += 1
+
+    def add(self, result: SignInResult) -> str:
+        """统计一个签到结果，返回其状态"""
+        status = classify(result)
+        self.status_counts[status] += 1
+        game_counter = self.game_counts.get(result.game)
+        if game_counter is None:
+            game_counter = self.game_counts[result.game] = Counter()
+        game_counter[status] += 1
+        if status == STATUS_SUCCESS:
+            for name, count in result.awards:
+                self.award_totals[name] += count
+        return status
+
+    @staticmethod
+    def _format_counts(counter: Counter[str]) -> str:
+        return " / ".join(f"{s} {counter[s]}" for s in (STATUS_SUCCESS, STATUS_SIGNED, STATUS_FAILED))
+
+    def render(self) -> list[str]:
+        """生成汇总文本行"""
+        lines = [
+            f"账号: {self.accounts} (异常 {self.account_errors}, 无角色 {self.no_roles})",
+            f"签到: {self._format_counts(self.status_counts)}",
+        ]
+        for game, counter in self.game_counts.items():
+            lines.append(f"  {game}: {self._format_counts(counter)}")
+        if self.award_totals:
+            awards = ", ".join(f"{name}x{count}" for name, count in self.award_totals.most_common())
+            lines.append(f"奖励: {awards}")
+        return lines
+
+
+# 页码标记 "[第 i/n 页]" 预留的字节数
+_MARKER_RESERVE = 32
+
+# 分页时单页字节上限的最小值，需容纳页码标记、"明细共 n 页" 与至少一行内容
+MIN_PAGE_BYTES = 128
+
+
+def _byte_len(text: str) -> int:
+    return len(text.encode("utf-8"))
+
+
+def _split_block(block: str, limit: int) -> list[str]:
+    """把超过 limit 字节的明细块按行拆开，单行过长时按字节截断"""
+    chunks = []
+    current: list[str] = []
+    size = 0
+    for line in block.split("\n"):
+        while _byte_len(line) > limit:
+            head = line.encode("utf-8")[:limit].decode("utf-8", "ignore")
+            if current:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            chunks.append(head)
+            line = line[len(head):]
+        n = _byte_len(line) + (1 if current else 0)
+        if current and size + n > limit:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+            n = _byte_len(line)
+        current.append(line)
+        size += n
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _pack(blocks: list[str], limit: int) -> list[str]:
+    """把多个文本块按 limit 字节装页，块之间空一行；超长的块按行拆开"""
+    bodies = []
+    current: list[str] = []
+    size = 0
+    for block in blocks:
+        chunks = _split_block(block, limit) if _byte_len(block) > limit else [block]
+        for chunk in chunks:
+            n = _byte_len(chunk) + (2 if current else 0)
+            if current and size + n > limit:
+                bodies.append("\n\n".join(current))
+                current, size = [], 0
+                n = _byte_len(chunk)
+            current.append(chunk)
+            size += n
+    if current:
+        bodies.append("\n\n".join(current))
+    return bodies
+
+
+def render_pages(title: str, summary_lines: list[str], detail_blocks: list[str], page_bytes: int) -> list[str]:
+    """
+    渲染报告页面
+
+    :param title: 报告标题
+    :param summary_lines: 汇总文本行
+    :param detail_blocks: 每个账号的明细文本（按账号顺序）
+    :param page_bytes: 单页字节上限，<= 0 表示不分页；小于 MIN_PAGE_BYTES 时按 MIN_PAGE_BYTES 处理
+    :return: 页面列表；放得下时只有一页，否则先是汇总页（过长时同样拆分），之后为明细页，
+             每页带页码标记
+    """
+    summary = "\n".join([title, ""] + summary_lines)
+    full = "\n\n".join([summary] + detail_blocks)
+    if page_bytes <= 0 or _byte_len(full) <= page_bytes:
+        return [full]
+
+    budget = max(page_bytes, MIN_PAGE_BYTES) - _MARKER_RESERVE
+    bodies = _pack(detail_blocks, budget)
+    # 汇总页末尾还要追加 "明细共 n 页"，同样预留空间
+    summary_pages = _split_block(summary, budget - _MARKER_RESERVE) if bodies else _split_block(summary, budget)
+    if bodies:
+        summary_pages[-1] += f"\n\n明细共 {len(bodies)} 页"
+
+    pages = summary_pages + bodies
+    total = len(pages)
+    return [f"[第 {i}/{total} 页]\n{page}" for i, page in enumerate(pages, 1)]